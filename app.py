@@ -6,7 +6,9 @@ import streamlit as st
 from transformers import pipeline
 from dotenv import load_dotenv
 from openai import OpenAI
-import os, re, json, base64
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import os, re, json, base64, time, uuid, logging, threading, hashlib, tempfile
 
 # ── Load environment ───────────────────────────────────────────────────────────
 load_dotenv()
@@ -74,6 +76,16 @@ st.markdown(
 )
 
 # ── Emotion Model ─────────────────────────────────────────────────────────────
+# Love Coach timeline settings (see Emotion Timeline below)
+EMOTION_BATCH_SIZE = 8
+MOOD_WINDOW = 6  # messages per speaker in the rolling mood mix
+VALENCE = {"joy": 1.0, "surprise": 0.3, "neutral": 0.0, "fear": -0.8,
+           "sadness": -1.0, "anger": -1.0, "disgust": -1.0}
+TIMELINE_DIR = os.getenv("PAIRFECT_TIMELINE_DIR", "")  # opt-in; empty keeps nothing on disk
+MAX_SAVED_SESSIONS = 20  # per couple; older session files are pruned
+EMOTION_EMOJI = {"joy": "😊", "surprise": "😮", "neutral": "😐", "fear": "😟", "sadness": "😢",
+                 "anger": "😠", "disgust": "😖", "calm": "😌"}
+
 @st.cache_resource
 def load_emotion_model():
     return pipeline(
@@ -83,16 +95,165 @@ def load_emotion_model():
     )
 emotion_model = load_emotion_model()
 
-def analyze_emotion(text: str):
-    if not text.strip():
-        return {"emotions": {}, "top_emotion": "neutral"}
-    res = emotion_model(text)[0]
+def _emotion_result(text, res):
     emotions = {r["label"]: round(r["score"] * 100, 2) for r in res}
     top = max(emotions, key=emotions.get)
     if any(w in text.lower() for w in ["calm", "peace", "relaxed", "serene"]):
         top = "calm"
     return {"emotions": emotions, "top_emotion": top}
 
+def analyze_emotion(text: str):
+    if not text.strip():
+        return {"emotions": {}, "top_emotion": "neutral"}
+    return _emotion_result(text, emotion_model(text)[0])
+
+def analyze_emotions(texts):
+    """Classify several texts in one batched pass of the local model."""
+    results = [{"emotions": {}, "top_emotion": "neutral"} for _ in texts]
+    todo = [i for i, t in enumerate(texts) if t.strip()]
+    if todo:
+        batch = emotion_model([texts[i] for i in todo], batch_size=EMOTION_BATCH_SIZE, truncation=True)
+        for i, res in zip(todo, batch):
+            results[i] = _emotion_result(texts[i], res)
+    return results
+
+# ── Emotion Timeline ──────────────────────────────────────────────────────────
+# Love Coach messages are scored once, when they are appended to chat_history;
+# per-speaker aggregates are updated from the new scores only, so a rerun never
+# re-classifies earlier turns. With PAIRFECT_TIMELINE_DIR set, each session's
+# aggregates (never message text) go to their own file under a key derived
+# from the couple photo and names, so sessions can be compared later.
+def valence(emotions):
+    return round(sum(VALENCE.get(l, 0.0) * s for l, s in emotions.items()) / 100, 3)
+
+def couple_key(photo_bytes, *names):
+    """Stable key for saved timelines: the couple photo plus both names."""
+    who = "\0".join(sorted(n.strip().lower() for n in names))
+    return hashlib.sha256(photo_bytes + b"\0" + who.encode()).hexdigest()
+
+def speaker_labels(ctx):
+    """Display names per speaker slot; aggregates are keyed by slot so equal names never merge."""
+    n1, n2 = ctx["u1_name"], ctx["u2_name"]
+    if n1.strip().lower() == n2.strip().lower():
+        n1, n2 = f"{n1} (1)", f"{n2} (2)"
+    return {"u1": n1, "u2": n2, "coach": "Love Coach"}
+
+def new_timeline(ctx):
+    return {"session_id": ctx["session_id"], "couple": ctx["couple_key"], "started": time.time(),
+            "scored": 0, "entries": [], "speakers": {}, "labels": speaker_labels(ctx),
+            "past": past_sessions(ctx["couple_key"], ctx["session_id"])}
+
+def _add_to_aggregate(agg, entry):
+    agg["n"] += 1
+    agg["valence_sum"] += entry["valence"]
+    agg["window"].append({"emotions": entry["emotions"], "valence": entry["valence"]})
+    for label, score in entry["emotions"].items():
+        agg["window_sum"][label] = agg["window_sum"].get(label, 0.0) + score
+    if len(agg["window"]) > MOOD_WINDOW:
+        for label, score in agg["window"].pop(0)["emotions"].items():
+            agg["window_sum"][label] -= score
+
+def speaker_summary(agg):
+    """Rolling mood mix and trend (recent valence vs. the speaker's overall mean)."""
+    w = len(agg["window"])
+    mix = {l: round(s / w, 2) for l, s in agg["window_sum"].items()} if w else {}
+    recent = sum(e["valence"] for e in agg["window"]) / w if w else 0.0
+    overall = agg["valence_sum"] / agg["n"] if agg["n"] else 0.0
+    delta = recent - overall
+    trend = "warming" if delta > 0.1 else "cooling" if delta < -0.1 else "steady"
+    top = max(mix, key=mix.get) if mix else "neutral"
+    return {"messages": agg["n"], "mood_mix": mix, "top_emotion": top,
+            "valence": round(recent, 3), "trend": trend}
+
+def update_timeline(tl, history):
+    """Score only the messages appended since the last call; returns True if anything changed."""
+    new = history[tl["scored"]:]
+    if not new:
+        return False
+    for offset, (msg, res) in enumerate(zip(new, analyze_emotions([m["content"] for m in new]))):
+        speaker = msg.get("speaker") or ("coach" if msg["role"] == "assistant" else "u1")
+        entry = {"idx": tl["scored"] + offset, "role": msg["role"], "speaker": speaker,
+                 "top_emotion": res["top_emotion"], "emotions": res["emotions"],
+                 "valence": valence(res["emotions"])}
+        tl["entries"].append(entry)
+        agg = tl["speakers"].setdefault(speaker, {"n": 0, "valence_sum": 0.0, "window": [], "window_sum": {}})
+        _add_to_aggregate(agg, entry)
+    tl["scored"] = len(history)
+    return True
+
+def _mtime(path):
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return 0.0
+
+def save_timeline(tl):
+    """Write this session's summary to its own file, so sessions never share a write."""
+    if not TIMELINE_DIR:
+        return
+    folder = Path(TIMELINE_DIR) / tl["couple"]
+    try:
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / f"{tl['session_id']}.json"
+        first_save = not path.exists()
+        with tempfile.NamedTemporaryFile("w", dir=folder, suffix=".tmp", delete=False) as f:
+            json.dump({"started": tl["started"], "messages": tl["scored"],
+                       "speakers": {slot: {**speaker_summary(agg), "name": tl["labels"][slot]}
+                                    for slot, agg in tl["speakers"].items()}}, f)
+        os.replace(f.name, path)
+        if first_save:
+            for old in sorted(folder.glob("*.json"), key=_mtime, reverse=True)[MAX_SAVED_SESSIONS:]:
+                old.unlink(missing_ok=True)
+    except (OSError, ValueError) as e:
+        st.warning(f"Could not save the emotion timeline: {e}")
+
+def past_sessions(couple, session_id):
+    """Saved summaries of this couple's earlier Love Coach sessions, newest first.
+
+    Read once when a timeline starts, not on every rerun.
+    """
+    if not TIMELINE_DIR:
+        return []
+    past = []
+    for path in sorted((Path(TIMELINE_DIR) / couple).glob("*.json"), key=_mtime, reverse=True):
+        if path.stem == session_id:
+            continue
+        try:
+            past.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return sorted(past[:MAX_SAVED_SESSIONS], key=lambda p: p.get("started", 0), reverse=True)
+
+def mood_caption(tl, entry):
+    st.caption(f"{EMOTION_EMOJI.get(entry['top_emotion'], '')} {tl['labels'][entry['speaker']]} · {entry['top_emotion']}")
+
+def show_timeline(tl):
+    with st.expander("📊 Emotion Timeline", expanded=False):
+        if not tl["entries"]:
+            st.caption("Start chatting to see how your moods move through the conversation.")
+            return
+        trend_icon = {"warming": "📈", "steady": "➖", "cooling": "📉"}
+        cols = st.columns(len(tl["speakers"]))
+        for col, (slot, agg) in zip(cols, tl["speakers"].items()):
+            s = speaker_summary(agg)
+            with col:
+                st.metric(tl["labels"][slot], f"{EMOTION_EMOJI.get(s['top_emotion'], '')} {s['top_emotion']}",
+                          f"{trend_icon[s['trend']]} {s['trend']}", delta_color="off")
+                st.bar_chart([{"emotion": l, "score": v} for l, v in s["mood_mix"].items()],
+                             x="emotion", y="score", height=180)
+        st.markdown("**Mood over the conversation** (valence: +1 joyful … −1 distressed)")
+        st.line_chart([{"message": e["idx"] + 1, "speaker": tl["labels"][e["speaker"]], "valence": e["valence"]}
+                       for e in tl["entries"]],
+                      x="message", y="valence", color="speaker")
+        past = tl["past"]
+        if past:
+            st.markdown("**Earlier sessions**")
+            st.dataframe([
+                {"started": time.strftime("%Y-%m-%d %H:%M", time.localtime(p["started"])), "messages": p["messages"],
+                 **{f"{s.get('name', slot)} mood": f"{s['top_emotion']} ({s['trend']})" for slot, s in p["speakers"].items()}}
+                for p in past
+            ], use_container_width=True)
+
 # ── Vision Analysis ───────────────────────────────────────────────────────────
 def analyze_couple_image(photo_bytes):
     """Detect gender, mood, appearance, outfit with correction."""
@@ -136,6 +297,86 @@ def analyze_couple_image(photo_bytes):
         st.error(f"Vision analysis failed: {e}")
         return {"count": 0, "people": []}
 
+# ── Progressive Art ───────────────────────────────────────────────────────────
+# Art is rendered twice: a cheap preview shown right away, then a full-quality
+# render produced on a background thread and swapped in when it lands.
+ART_TIERS = {
+    "preview": {"model": "dall-e-2", "size": "512x512"},
+    "full": {"model": "dall-e-3", "size": "1024x1024"},
+}
+GALLERY_TIERS = {
+    "preview": {"model": "gpt-image-1", "size": "1024x1024", "quality": "low"},
+    "full": {"model": "gpt-image-1", "size": "1024x1024"},
+}
+PROGRESSIVE_ART = os.getenv("PAIRFECT_PROGRESSIVE_ART", "1") != "0"
+UPGRADE_POLL_SECONDS = 2
+log = logging.getLogger("pairfect")
+
+# "always": finish every upgrade | "stay": skip it once the user leaves the page | "never": preview only
+UPGRADE_POLICY = os.getenv("PAIRFECT_ART_UPGRADE", "stay").strip().lower()
+if UPGRADE_POLICY not in ("always", "stay", "never"):
+    log.warning("Unknown PAIRFECT_ART_UPGRADE=%r; using 'stay'.", UPGRADE_POLICY)
+    UPGRADE_POLICY = "stay"
+
+UPGRADE_WORKERS = os.getenv("PAIRFECT_UPGRADE_WORKERS", "4").strip()
+if not UPGRADE_WORKERS.isdigit() or int(UPGRADE_WORKERS) < 1:
+    log.warning("Invalid PAIRFECT_UPGRADE_WORKERS=%r; using 4.", UPGRADE_WORKERS)
+    UPGRADE_WORKERS = "4"
+UPGRADE_WORKERS = int(UPGRADE_WORKERS)
+
+@st.cache_resource
+def upgrade_pool():
+    return ThreadPoolExecutor(max_workers=UPGRADE_WORKERS, thread_name_prefix="art-upgrade")
+
+def _render_upgrade(prompt, tier, stale):
+    # Runs off the script thread, so no st.* calls here; a failed upgrade keeps the preview.
+    # `stale` is set once the user has moved on, so a queued upgrade never reaches the API.
+    if stale.is_set():
+        return None
+    try:
+        return render_image(prompt, **tier)
+    except Exception:
+        log.exception("Full-quality art upgrade failed (model=%s); keeping the preview.", tier.get("model"))
+        return None
+
+def start_upgrade(key, prompt, tier):
+    """Queue the full-quality render for `key`, tied to the page the user is on."""
+    cancel_upgrade(key)
+    if not PROGRESSIVE_ART or UPGRADE_POLICY == "never":
+        return
+    stale = threading.Event()
+    fut = upgrade_pool().submit(_render_upgrade, prompt, tier, stale)
+    st.session_state.pending_upgrades[key] = (st.session_state.page, fut, stale)
+
+def cancel_upgrade(key):
+    """Skip `key`'s upgrade if it has not been sent yet; an in-flight render is discarded."""
+    entry = st.session_state.pending_upgrades.pop(key, None)
+    if entry:
+        entry[2].set()
+        entry[1].cancel()
+
+def skip_stale_upgrades():
+    """Drop upgrades for pages the user has already left (policy "stay")."""
+    if UPGRADE_POLICY != "stay":
+        return
+    for key, (page, *_) in list(st.session_state.pending_upgrades.items()):
+        if page != st.session_state.page:
+            cancel_upgrade(key)
+
+def collect_upgrade(key):
+    """Pop `key` once its upgrade has finished; returns (finished, image_src or None)."""
+    entry = st.session_state.pending_upgrades.get(key)
+    if not entry or not entry[1].done():
+        return False, None
+    del st.session_state.pending_upgrades[key]
+    fut = entry[1]
+    return True, None if fut.cancelled() else fut.result()
+
+def upgrade_fragment(keys):
+    """Fragment decorator that polls only while one of `keys` is still rendering."""
+    pending = any(k in st.session_state.pending_upgrades for k in keys)
+    return st.fragment(run_every=UPGRADE_POLL_SECONDS if pending else None)
+
 # ── AI + Art Helpers ──────────────────────────────────────────────────────────
 def get_ai_summary(u1, u2):
     p = f"""
@@ -171,13 +412,22 @@ Write a poetic 'Pairfect Thought' (4–6 lines) about:
     r = client.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": prompt}])
     return r.choices[0].message.content.strip()
 
-def generate_art(prompt: str):
+def render_image(prompt: str, model: str, size: str, **opts) -> str:
+    """Render one image and return something an <img> src can use (URL or data URI)."""
+    r = client.images.generate(model=model, prompt=prompt, size=size, n=1, **opts)
+    d = r.data[0]
+    return d.url or f"data:image/png;base64,{d.b64_json}"
+
+def generate_art(prompt: str, tier: str = "full"):
+    """Render art at `tier`, falling back to the full tier; returns (image_src, tier_rendered)."""
     try:
-        r = client.images.generate(model="dall-e-3", prompt=prompt, size="1024x1024")
-        return r.data[0].url
+        return render_image(prompt, **ART_TIERS[tier]), tier
     except Exception as e:
+        if tier != "full":
+            # e.g. dall-e-2's shorter prompt limit; the full render is what the user would have got anyway
+            return generate_art(prompt, "full")
         st.error(str(e))
-        return None
+        return None, None
 
 def love_coach_reply(user_msg, ctx):
     system = "You are 'Pairfect Love Coach' — warm, empathetic, and insightful."
@@ -201,6 +451,22 @@ def heart_meter(score):
     </div>
     """, unsafe_allow_html=True)
 
+def show_art(c):
+    """Show the compatibility art, swapping in the full render once it arrives."""
+    @upgrade_fragment(["art"])
+    def art_frame():
+        finished, full = collect_upgrade("art")
+        if finished:
+            if full:
+                c["art_url"] = full
+            st.rerun()  # full rerun so the fragment stops polling
+        if c["art_url"]:
+            st.markdown(f"<div class='center'><img src='{c['art_url']}' width='500' "
+                        "style='border-radius:20px;box-shadow:0 8px 24px rgba(255,105,180,0.3);'/></div>", unsafe_allow_html=True)
+            if "art" in st.session_state.pending_upgrades:
+                st.caption("✨ Preview shown — the full-quality render is on its way…")
+    art_frame()
+
 def describe_for_art(img_bytes: bytes) -> str:
     """Create a compact, vivid prompt from a couple photo."""
     img_b64 = base64.b64encode(img_bytes).decode("utf-8")
@@ -222,7 +488,8 @@ def describe_for_art(img_bytes: bytes) -> str:
 
 # ── State Initialization ──────────────────────────────────────────────────────
 for k, v in {"page": "Compatibility & Art", "content": None, "ctx": None, "photo_hash": None,
-             "gender_label": None, "chat_history": [], "vision_result": None}.items():
+             "gender_label": None, "chat_history": [], "vision_result": None,
+             "pending_upgrades": {}, "gallery": None, "emotion_timeline": None}.items():
     st.session_state.setdefault(k, v)
 
 # ── Header ────────────────────────────────────────────────────────────────────
@@ -248,13 +515,13 @@ with col5:
         st.session_state.page = "About Pairfect"
 
 st.markdown("<hr style='border:1px solid pink;'>", unsafe_allow_html=True)
+skip_stale_upgrades()
 
 # ── Compatibility & Art Page ──────────────────────────────────────────────────
 if st.session_state.page == "Compatibility & Art":
-    # 🧹 Reset Love Coach Chat and Context when user re-enters Compatibility page
-    st.session_state.chat_history = []
-    st.session_state.ctx = None
-    
+    # Love Coach chat and context are reset below when the photo changes or a new
+    # analysis is generated, not on every run: reruns of this page (widget edits,
+    # the art upgrade landing) must keep the context Love Coach needs.
     st.subheader("📸 Upload or Capture Your Couple Photo")
     photo = st.file_uploader("Upload", type=["jpg", "jpeg", "png"])
     snap = st.camera_input("Or Take a Photo 💕")
@@ -262,6 +529,7 @@ if st.session_state.page == "Compatibility & Art":
     if not img:
         for key in ["content", "ctx", "gender_label", "vision_result"]:
             st.session_state.pop(key, None)
+        cancel_upgrade("art")
         st.stop()
 
     h = hash(img.getvalue())
@@ -273,6 +541,7 @@ if st.session_state.page == "Compatibility & Art":
         st.session_state.ctx = None          # Reset context
         st.session_state.content = None      # Reset summary, art, poem, etc.
         st.session_state.gender_label = None # Reset gender badge
+        cancel_upgrade("art")                # Drop any art still rendering for the old photo
         
         with st.spinner("Analyzing your photo with Vision AI..."):
             result = analyze_couple_image(img.getvalue())
@@ -314,7 +583,9 @@ if st.session_state.page == "Compatibility & Art":
                 summary = get_ai_summary(u1, u2)
             score = extract_score(summary)
             art_prompt = generate_art_prompt(u1, u2)
-            art_url = generate_art(art_prompt)
+            art_url, art_tier = generate_art(art_prompt, "preview" if PROGRESSIVE_ART else "full")
+            if art_tier == "preview":
+                start_upgrade("art", art_prompt, ART_TIERS["full"])
             poem = generate_poem(u1, u2)
             st.session_state.content = {
                 "summary": summary,
@@ -325,7 +596,10 @@ if st.session_state.page == "Compatibility & Art":
                 "u1_emotion": u1["emotion"]["emotions"],
                 "u2_emotion": u2["emotion"]["emotions"],
             }
-            st.session_state.ctx = {"u1_name": u1["name"], "u2_name": u2["name"], "score": score, "summary": summary}
+            st.session_state.chat_history = []   # New analysis, fresh Love Coach chat
+            st.session_state.ctx = {"u1_name": u1["name"], "u2_name": u2["name"], "score": score, "summary": summary,
+                                    "session_id": uuid.uuid4().hex,
+                                    "couple_key": couple_key(img.getvalue(), u1["name"], u2["name"])}
             st.success("✅ Pairfect Analysis Complete!")
 
     if st.session_state.get("content"):
@@ -336,9 +610,7 @@ if st.session_state.page == "Compatibility & Art":
         heart_meter(c["score"])
         st.subheader("🎨 Art Prompt")
         st.write(c["art_prompt"])
-        if c["art_url"]:
-            st.markdown(f"<div class='center'><img src='{c['art_url']}' width='500' "
-                        "style='border-radius:20px;box-shadow:0 8px 24px rgba(255,105,180,0.3);'/></div>", unsafe_allow_html=True)
+        show_art(c)
         st.markdown(f"<div class='poem-box'><h4 style='color:#ff4b6e;'>📝 Poetic 'Pairfect Thought'</h4><p>{c['poem']}</p></div>", unsafe_allow_html=True)
 
 # ── Love Coach Chat ───────────────────────────────────────────────────────────
@@ -348,19 +620,30 @@ if st.session_state.page == "Love Coach Chat":
     if not ctx:
         st.info("💌 Please run 'Generate Pairfect Analysis' in Compatibility & Art first!")
     else:
-        for msg in st.session_state.chat_history:
+        # One timeline per analysis; start over if the chat was reset underneath it
+        tl = st.session_state.emotion_timeline
+        if not tl or tl["session_id"] != ctx["session_id"] or tl["scored"] > len(st.session_state.chat_history):
+            tl = st.session_state.emotion_timeline = new_timeline(ctx)
+        # Catch up on anything not scored yet (e.g. a fresh timeline) so every bubble gets its mood
+        if update_timeline(tl, st.session_state.chat_history):
+            save_timeline(tl)
+
+        for msg, entry in zip(st.session_state.chat_history, tl["entries"]):
             with st.chat_message(msg["role"]):
                 st.markdown(msg["content"])
+                mood_caption(tl, entry)
+        speaker = st.radio("Speaking as", ["u1", "u2"], format_func=tl["labels"].get, horizontal=True, key="coach_speaker")
         user_msg = st.chat_input("Ask the Love Coach anything about your connection…")
 
         if user_msg:
             # Show the user's message instantly
-            st.session_state.chat_history.append({"role": "user", "content": user_msg})
-            with st.chat_message("user"):
-                st.markdown(user_msg)
+            st.session_state.chat_history.append({"role": "user", "content": user_msg, "speaker": speaker})
+            user_box = st.chat_message("user")
+            user_box.markdown(user_msg)
 
             # Generate and display assistant reply
-            with st.chat_message("assistant"):
+            assistant_box = st.chat_message("assistant")
+            with assistant_box:
                 with st.spinner("💞 Pairfect Love Coach is thinking..."):
                     reply = love_coach_reply(user_msg, ctx)
                 st.markdown(reply)
@@ -368,6 +651,14 @@ if st.session_state.page == "Love Coach Chat":
             # Save assistant reply to chat history
             st.session_state.chat_history.append({"role": "assistant", "content": reply})
 
+            # Score just the new turn in one batch, caption its bubbles and persist the aggregates
+            if update_timeline(tl, st.session_state.chat_history):
+                save_timeline(tl)
+            for box, entry in zip((user_box, assistant_box), tl["entries"][-2:]):
+                with box:
+                    mood_caption(tl, entry)
+        show_timeline(tl)
+
 
 # ── Mood Music Tab ────────────────────────────────────────────────────────────
 if st.session_state.page == "Mood Music":
@@ -509,94 +800,107 @@ if st.session_state.page == "Love Art Gallery":
         else:
             st.success("✅ Perfect! You've uploaded 3 beautiful memories. Let’s turn them into AI art...")
 
-            art_images = []
-
-            for idx, img_file in enumerate(uploaded_files, start=1):
-                with st.spinner(f"🎨 Creating your dreamy AI art #{idx} for {img_file.name}..."):
-                    try:
-                        img_bytes = img_file.read()
-                        base_desc = describe_for_art(img_bytes)
-                        style = (
-                            " — render as a cinematic romantic digital painting with warm, soft light, "
-                            "gentle bokeh, pastel glow, painterly brush strokes; keep faces recognizable."
-                        )
-                        art_prompt = (base_desc or "A smiling couple in a tender pose") + style
-
-                        # Primary: gpt-image-1
-                        art_result = client.images.generate(
-                            model="gpt-image-1",
-                            prompt=art_prompt,
-                            size="1024x1024",
-                            n=1
-                        )
-                        art_b64 = art_result.data[0].b64_json
-                        art_bytes = base64.b64decode(art_b64)
-                        art_images.append(f"data:image/png;base64,{base64.b64encode(art_bytes).decode()}")
-
-                    except Exception:
-                        # Fallback: DALL·E 3 (URL)
+            # Render once per set of uploads; reruns reuse the stored gallery.
+            gallery_id = tuple(f.file_id for f in uploaded_files)
+            if (st.session_state.gallery or {}).get("id") != gallery_id:
+                for key in [k for k in st.session_state.pending_upgrades if k.startswith("gallery_")]:
+                    cancel_upgrade(key)
+                art_images = []
+
+                for idx, img_file in enumerate(uploaded_files, start=1):
+                    with st.spinner(f"🎨 Creating your dreamy AI art #{idx} for {img_file.name}..."):
                         try:
-                            art_result = client.images.generate(
-                                model="dall-e-3",
-                                prompt=art_prompt,
-                                size="1024x1024",
-                                n=1
+                            img_bytes = img_file.read()
+                            base_desc = describe_for_art(img_bytes)
+                            style = (
+                                " — render as a cinematic romantic digital painting with warm, soft light, "
+                                "gentle bokeh, pastel glow, painterly brush strokes; keep faces recognizable."
                             )
-                            art_images.append(art_result.data[0].url)
-                        except Exception as e2:
-                            st.error(f"Failed to generate art for {img_file.name}: {e2}")
+                            art_prompt = (base_desc or "A smiling couple in a tender pose") + style
+
+                            # Primary: gpt-image-1 (low-quality preview first when progressive)
+                            tier = GALLERY_TIERS["preview" if PROGRESSIVE_ART else "full"]
+                            art_images.append(render_image(art_prompt, **tier))
+                            if PROGRESSIVE_ART:
+                                start_upgrade(f"gallery_{len(art_images) - 1}", art_prompt, GALLERY_TIERS["full"])
+
+                        except Exception:
+                            # Fallback: DALL·E 3 (URL)
+                            try:
+                                art_images.append(render_image(art_prompt, model="dall-e-3", size="1024x1024"))
+                            except Exception as e2:
+                                st.error(f"Failed to generate art for {img_file.name}: {e2}")
+
+                st.session_state.gallery = {"id": gallery_id, "images": art_images}
+
+            art_images = st.session_state.gallery["images"]
+            upgrade_keys = [f"gallery_{i}" for i in range(len(art_images))]
 
             # --- CSS-ONLY SLIDESHOW (no JS) ---
-            if art_images:
-                st.markdown("<h4 style='text-align:center;color:#ff4b6e;'>💞 Your AI-Generated Love Art Slideshow</h4>", unsafe_allow_html=True)
-
-                # CSS Keyframe Slideshow
-                html = f"""
-                <div class="slideshow-container">
-                    {''.join([f"<div class='slide fade' style='background-image: url({img});'></div>" for img in art_images])}
-                </div>
-
-                <style>
-                .slideshow-container {{
-                    position: relative;
-                    width: 100%;
-                    max-width: 600px;
-                    height: 600px;
-                    margin: 0 auto;
-                    border-radius: 20px;
-                    overflow: hidden;
-                    box-shadow: 0 8px 24px rgba(255,105,180,0.4);
-                }}
-                .slide {{
-                    position: absolute;
-                    width: 100%;
-                    height: 100%;
-                    background-size: cover;
-                    background-position: center;
-                    opacity: 0;
-                    animation: fade 18s infinite;
-                }}
-                .slide:nth-child(1) {{ animation-delay: 0s; }}
-                .slide:nth-child(2) {{ animation-delay: 6s; }}
-                .slide:nth-child(3) {{ animation-delay: 12s; }}
-
-                @keyframes fade {{
-                    0% {{ opacity: 0; }}
-                    10% {{ opacity: 1; }}
-                    30% {{ opacity: 1; }}
-                    40% {{ opacity: 0; }}
-                    100% {{ opacity: 0; }}
-                }}
-                </style>
-                """
-                st.markdown(html, unsafe_allow_html=True)
-
-                st.markdown(
-                    "<p style='text-align:center; color:#ff4b6e; font-size:18px; margin-top:25px;'>"
-                    "✨ Love captured, colors revealed — your art speaks the language of your heart 💖"
-                    "</p>",
-                    unsafe_allow_html=True,
-                )
+            @upgrade_fragment(upgrade_keys)
+            def slideshow():
+                # Swap in any full-quality renders that landed since the last poll
+                finished = [collect_upgrade(k) for k in upgrade_keys]
+                for i, (done, full) in enumerate(finished):
+                    if done and full:
+                        art_images[i] = full
+                if any(done for done, _ in finished) and not any(k in st.session_state.pending_upgrades for k in upgrade_keys):
+                    st.rerun()  # all upgrades in; full rerun so the fragment stops polling
+
+                if art_images:
+                    st.markdown("<h4 style='text-align:center;color:#ff4b6e;'>💞 Your AI-Generated Love Art Slideshow</h4>", unsafe_allow_html=True)
+
+                    # CSS Keyframe Slideshow
+                    html = f"""
+                    <div class="slideshow-container">
+                        {''.join([f"<div class='slide fade' style='background-image: url({img});'></div>" for img in art_images])}
+                    </div>
+
+                    <style>
+                    .slideshow-container {{
+                        position: relative;
+                        width: 100%;
+                        max-width: 600px;
+                        height: 600px;
+                        margin: 0 auto;
+                        border-radius: 20px;
+                        overflow: hidden;
+                        box-shadow: 0 8px 24px rgba(255,105,180,0.4);
+                    }}
+                    .slide {{
+                        position: absolute;
+                        width: 100%;
+                        height: 100%;
+                        background-size: cover;
+                        background-position: center;
+                        opacity: 0;
+                        animation: fade 18s infinite;
+                    }}
+                    .slide:nth-child(1) {{ animation-delay: 0s; }}
+                    .slide:nth-child(2) {{ animation-delay: 6s; }}
+                    .slide:nth-child(3) {{ animation-delay: 12s; }}
+
+                    @keyframes fade {{
+                        0% {{ opacity: 0; }}
+                        10% {{ opacity: 1; }}
+                        30% {{ opacity: 1; }}
+                        40% {{ opacity: 0; }}
+                        100% {{ opacity: 0; }}
+                    }}
+                    </style>
+                    """
+                    st.markdown(html, unsafe_allow_html=True)
+                    if any(k in st.session_state.pending_upgrades for k in upgrade_keys):
+                        st.caption("✨ Previews shown — full-quality renders are on their way…")
+
+                    st.markdown(
+                        "<p style='text-align:center; color:#ff4b6e; font-size:18px; margin-top:25px;'>"
+                        "✨ Love captured, colors revealed — your art speaks the language of your heart 💖"
+                        "</p>",
+                        unsafe_allow_html=True,
+                    )
+
+            slideshow()
     else:
         st.info("Upload 3 photos to see the magic of love-infused AI art! 🎨")
 
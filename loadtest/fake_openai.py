@@ -0,0 +1,166 @@
+# =========================================
+# 🧪 Fake OpenAI backend for Pairfect load tests
+# =========================================
+# Serves just enough of /v1/chat/completions and /v1/images/generations for
+# app.py, with configurable latency and 429 injection. Point the app at it with
+#   OPENAI_BASE_URL=http://127.0.0.1:<port>/v1
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse, base64, json, random, struct, threading, time, zlib
+
+
+def tiny_png(rgb=(255, 105, 180), size=8) -> bytes:
+    """Solid-colour PNG built with the stdlib, so no imaging dependency is needed."""
+    def chunk(tag, data):
+        body = tag + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+    raw = b"".join(b"\x00" + bytes(rgb) * size for _ in range(size))
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw))
+            + chunk(b"IEND", b""))
+
+
+PNG_B64 = base64.b64encode(tiny_png()).decode()
+# Previews get their own image so a load test can tell whether the full render ever replaced one.
+PREVIEW_PNG_B64 = base64.b64encode(tiny_png((200, 200, 200))).decode()
+
+VISION_JSON = json.dumps({
+    "count": 2,
+    "people": [
+        {"gender": "male", "mood": "joyful", "appearance": "short hair, beard", "outfit": "blue shirt"},
+        {"gender": "female", "mood": "serene", "appearance": "long hair", "outfit": "red dress"},
+    ],
+})
+
+
+def chat_reply(body) -> str:
+    """Pick a canned answer shaped like what the calling helper in app.py parses."""
+    text = json.dumps(body.get("messages", []))
+    if "Analyze this couple photo" in text:
+        return VISION_JSON
+    if "Look at the couple photo" in text:
+        return "A smiling couple in matching jackets laughing under warm string lights."
+    if "Compatibility Score" in text:
+        return "1. Overview: a warm, balanced pair.\n2. Compatibility Score 82/100\n3. Shared humour.\n4. Keep talking."
+    if "Pairfect Thought" in text:
+        return "Two hearts, one rhythm,\nsoft light on a shared road,\nlaughter as their map,\nand home wherever they go."
+    return "Try planning one small surprise for each other this week 💞"
+
+
+class FakeOpenAI:
+    """Threaded fake server; `stats` counts requests per endpoint and injected 429s."""
+
+    def __init__(self, host="127.0.0.1", port=0, chat_latency=0.8, image_latency=4.0,
+                 preview_latency=1.0, jitter=0.25, rate_429=0.0, retry_after=1.0):
+        self.chat_latency, self.image_latency, self.preview_latency = chat_latency, image_latency, preview_latency
+        self.jitter, self.rate_429, self.retry_after = jitter, rate_429, retry_after
+        self.stats = {"chat": 0, "images": 0, "429": 0}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True, name="fake-openai").start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _sleep(self, seconds):
+        time.sleep(max(0.0, seconds * random.uniform(1 - self.jitter, 1 + self.jitter)))
+
+    @staticmethod
+    def _is_preview(body):
+        return body.get("quality") == "low" or body.get("size") in ("256x256", "512x512")
+
+    def _image_latency(self, body):
+        # Mirror the real API: low quality / small sizes come back much faster.
+        return self.preview_latency if self._is_preview(body) else self.image_latency
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload, headers=None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if random.random() < fake.rate_429:
+                    fake._count("429")
+                    return self._send(429, {"error": {"message": "Rate limit reached (injected)", "type": "requests",
+                                                      "code": "rate_limit_exceeded"}},
+                                      {"retry-after-ms": str(int(fake.retry_after * 1000))})
+
+                if self.path.endswith("/chat/completions"):
+                    fake._count("chat")
+                    fake._sleep(fake.chat_latency)
+                    return self._send(200, {
+                        "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+                        "model": body.get("model", "gpt-4o-mini"),
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": chat_reply(body)}}],
+                        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                    })
+
+                if self.path.endswith("/images/generations"):
+                    fake._count("images")
+                    fake._sleep(fake._image_latency(body))
+                    png = PREVIEW_PNG_B64 if fake._is_preview(body) else PNG_B64
+                    # gpt-image-1 answers with b64_json; the dall-e models with a URL.
+                    item = ({"b64_json": png} if body.get("model") == "gpt-image-1"
+                            else {"url": f"data:image/png;base64,{png}"})
+                    return self._send(200, {"created": int(time.time()), "data": [item]})
+
+                self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+        return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Fake OpenAI backend for Pairfect load tests.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--chat-latency", type=float, default=0.8, help="seconds per chat completion")
+    ap.add_argument("--image-latency", type=float, default=4.0, help="seconds per full-quality image")
+    ap.add_argument("--preview-latency", type=float, default=1.0, help="seconds per low-quality/small image")
+    ap.add_argument("--jitter", type=float, default=0.25, help="± fraction applied to every latency")
+    ap.add_argument("--rate-429", type=float, default=0.0, help="probability of answering 429 instead")
+    ap.add_argument("--retry-after", type=float, default=1.0, help="seconds advertised on injected 429s")
+    a = ap.parse_args()
+    fake = FakeOpenAI(a.host, a.port, a.chat_latency, a.image_latency, a.preview_latency,
+                      a.jitter, a.rate_429, a.retry_after)
+    print(f"Fake OpenAI listening on {fake.base_url}")
+    try:
+        fake.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Requests served: {fake.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+# =========================================
+# 🧪 Pairfect multi-session load test
+# =========================================
+# Starts the fake OpenAI backend and a real `streamlit run app.py`, then drives
+# simulated browser sessions (headless Chromium via Playwright) through the
+# whole flow: upload photo → fill form → Generate → Love Coach turns → gallery.
+# Concurrency is ramped level by level to find where throughput stops scaling.
+#
+#   pip install -r loadtest/requirements.txt && playwright install chromium
+#   python loadtest/run_load.py --levels 1,2,4,8,16 --rate-429 0.05
+
+from pathlib import Path
+import argparse, asyncio, json, math, os, socket, subprocess, sys, tempfile, time, urllib.request
+
+from playwright.async_api import async_playwright
+
+from fake_openai import FakeOpenAI, PREVIEW_PNG_B64, tiny_png
+
+ROOT = Path(__file__).resolve().parent.parent
+GALLERY_PASS = "loadtest"
+COACH_QUESTIONS = [
+    "How can we communicate better when we're both stressed?",
+    "What's a fun date idea for this weekend?",
+    "How do we keep the spark alive long-distance?",
+    "Any tips for handling small disagreements?",
+]
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def rss_mb(pid):
+    """Resident set size of `pid` in MB (Linux /proc), or None if unavailable."""
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+def pct(values, q):
+    if not values:
+        return None
+    s = sorted(values)
+    return s[min(len(s) - 1, math.ceil(q / 100 * len(s)) - 1)]
+
+def wait_healthy(url, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if urllib.request.urlopen(f"{url}/_stcore/health", timeout=2).read().strip() == b"ok":
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Streamlit did not become healthy at {url} within {timeout}s")
+
+def start_streamlit(port, base_url):
+    env = dict(os.environ, OPENAI_BASE_URL=base_url, OPENAI_API_KEY="sk-loadtest", LOVE_GALLERY_PASS=GALLERY_PASS)
+    return subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", str(ROOT / "app.py"), "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+def write_photos(folder: Path):
+    photo = folder / "couple.png"
+    photo.write_bytes(tiny_png((255, 182, 193)))
+    gallery = []
+    for i, rgb in enumerate([(255, 75, 110), (0, 191, 255), (255, 215, 0)], start=1):
+        p = folder / f"memory_{i}.png"
+        p.write_bytes(tiny_png(rgb))
+        gallery.append(str(p))
+    return str(photo), gallery
+
+
+# ── One simulated browser session ─────────────────────────────────────────────
+async def idle(page, timeout):
+    """Wait until Streamlit has finished the current script run."""
+    await page.wait_for_timeout(150)
+    await page.get_by_test_id("stStatusWidget").wait_for(state="hidden", timeout=timeout)
+
+async def timed(timings, step, coro):
+    t0 = time.perf_counter()
+    await coro
+    timings.setdefault(step, []).append(time.perf_counter() - t0)
+
+async def run_flow(browser, url, photo, gallery, turns, timeout):
+    """Drive one full user journey; returns ({step: [seconds, ...]}, art_upgraded)."""
+    timings = {}
+    ctx = await browser.new_context()
+    page = await ctx.new_page()
+    page.set_default_timeout(timeout)
+    try:
+        async def load():
+            await page.goto(url)
+            await page.get_by_role("button", name="🎨 Compatibility & Art").wait_for()
+            await idle(page, timeout)
+        await timed(timings, "page_load", load())
+
+        async def upload():
+            await page.locator("input[type='file']").first.set_input_files(photo)
+            await page.get_by_label("Your Name").wait_for()
+            await idle(page, timeout)
+        await timed(timings, "upload_photo", upload())
+
+        for label, value in [("Your Name", "Arjun"), ("Your Personality", "Calm, curious and kind."),
+                             ("Partner’s Name", "Meera"), ("Partner Personality", "Joyful, bold and caring.")]:
+            await page.get_by_label(label).fill(value)
+            await page.get_by_label(label).press("Tab")
+            await idle(page, timeout)
+
+        async def generate():
+            await page.get_by_role("button", name="✨ Generate Pairfect Analysis").click()
+            await page.get_by_text("Pairfect Analysis Complete").wait_for()
+            await idle(page, timeout)
+        await timed(timings, "generate", generate())
+
+        # Stay on the page until the background full-quality render replaces the preview
+        # (polled every couple of seconds by the app, so this includes that granularity).
+        async def art_upgrade():
+            await page.get_by_text("Preview shown").wait_for(state="hidden")
+        await timed(timings, "art_upgrade", art_upgrade())
+        art = await page.locator("img[src^='data:image/png']").first.get_attribute("src")
+        upgraded = PREVIEW_PNG_B64 not in (art or "")
+
+        await page.get_by_role("button", name="🧠 Love Coach Chat").click()
+        await idle(page, timeout)
+        # Fail fast if the analysis context was lost, instead of timing out on a chat input that never renders.
+        chat = page.get_by_test_id("stChatInputTextArea")
+        no_ctx = page.get_by_text("Please run 'Generate Pairfect Analysis'")
+        await chat.or_(no_ctx).first.wait_for()
+        if await no_ctx.count():
+            raise RuntimeError("Love Coach lost the analysis context after Generate")
+        messages = page.get_by_test_id("stChatMessage")
+        for i in range(turns):
+            async def turn():
+                await chat.fill(COACH_QUESTIONS[i % len(COACH_QUESTIONS)])
+                await chat.press("Enter")
+                await messages.nth(2 * i + 1).wait_for()
+                await idle(page, timeout)
+            await timed(timings, "coach_turn", turn())
+
+        await page.get_by_role("button", name="🖼️ Love Art Gallery").click()
+        await idle(page, timeout)
+        await page.get_by_label("Enter Access Password to Unlock Gallery 🔑").fill(GALLERY_PASS)
+        await page.get_by_label("Enter Access Password to Unlock Gallery 🔑").press("Enter")
+        await page.get_by_text("Access Granted").wait_for()
+
+        async def gallery_step():
+            await page.locator("input[type='file']").first.set_input_files(gallery)
+            await page.get_by_text("Your AI-Generated Love Art Slideshow").wait_for()
+        await timed(timings, "gallery", gallery_step())
+        return timings, upgraded
+    finally:
+        await ctx.close()
+
+
+# ── Ramp ──────────────────────────────────────────────────────────────────────
+async def run_level(browser, args, photo, gallery, sessions, pid):
+    """Run `sessions` concurrent users, each completing `args.flows` journeys."""
+    timings, errors, missed = {}, [], []
+
+    async def user():
+        for _ in range(args.flows):
+            try:
+                flow, upgraded = await run_flow(browser, args.url, photo, gallery, args.turns, args.timeout * 1000)
+                for step, vals in flow.items():
+                    timings.setdefault(step, []).extend(vals)
+                if not upgraded:
+                    missed.append(1)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}")
+
+    rss_before = rss_mb(pid) if pid else None
+    t0 = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(sessions)))
+    wall = time.perf_counter() - t0
+    rss_after = rss_mb(pid) if pid else None
+    done = sessions * args.flows - len(errors)
+    return {
+        "sessions": sessions,
+        "flows_ok": done,
+        "errors": len(errors),
+        "art_upgrades_missed": len(missed),
+        "error_samples": sorted(set(errors))[:3],
+        "wall_s": round(wall, 2),
+        "throughput_flows_per_min": round(60 * done / wall, 2) if wall else 0.0,
+        "p95_s": {step: round(pct(v, 95), 2) for step, v in timings.items()},
+        "p50_s": {step: round(pct(v, 50), 2) for step, v in timings.items()},
+        "rss_mb": round(rss_after, 1) if rss_after else None,
+        "rss_growth_mb_per_session": (round((rss_after - rss_before) / (sessions * args.flows), 2)
+                                      if rss_before and rss_after else None),
+    }
+
+def saturation(levels, min_gain, max_error_rate):
+    """Where scaling stopped: the last level whose throughput still grew by `min_gain` within the
+    error budget ("saturated"), the first level already over budget ("failing"), or "not_reached"."""
+    best = None
+    for lvl in levels:
+        total = lvl["flows_ok"] + lvl["errors"]
+        error_rate = lvl["errors"] / total if total else 0.0
+        if error_rate > max_error_rate:
+            if best:
+                return {"status": "saturated", "sessions": best["sessions"],
+                        "reason": f"{lvl['sessions']} sessions exceed the error budget ({error_rate:.0%} errors)"}
+            return {"status": "failing", "sessions": lvl["sessions"],
+                    "reason": f"error rate {error_rate:.0%} already at the first level"}
+        if best and lvl["throughput_flows_per_min"] < best["throughput_flows_per_min"] * (1 + min_gain):
+            return {"status": "saturated", "sessions": best["sessions"],
+                    "reason": f"throughput stopped growing at {lvl['sessions']} sessions"}
+        best = lvl
+    return {"status": "not_reached", "sessions": best["sessions"] if best else None, "reason": None}
+
+def print_report(report):
+    steps = sorted({s for lvl in report["levels"] for s in lvl["p95_s"]})
+    print("\n💞 Pairfect load test")
+    print(f"   fake OpenAI: {report['backend']}")
+    head = f"{'sessions':>8} {'ok':>4} {'err':>4} {'no-upg':>6} {'flows/min':>10} {'RSS MB':>8} {'MB/sess':>8}  " + \
+           "  ".join(f"p95 {s:<12}" for s in steps)
+    print(head)
+    for lvl in report["levels"]:
+        p95 = "  ".join(f"{lvl['p95_s'].get(s, float('nan')):>16.2f}" for s in steps)
+        print(f"{lvl['sessions']:>8} {lvl['flows_ok']:>4} {lvl['errors']:>4} {lvl['art_upgrades_missed']:>6} "
+              f"{lvl['throughput_flows_per_min']:>10} "
+              f"{lvl['rss_mb'] or '-':>8} {lvl['rss_growth_mb_per_session'] or '-':>8}  {p95}")
+        for e in lvl["error_samples"]:
+            print(f"{'':>10}↳ {e}")
+    sat = report["saturation"]
+    if sat["status"] == "failing":
+        print(f"\nSaturated/failing already at {sat['sessions']} concurrent session(s): {sat['reason']}")
+    elif sat["status"] == "saturated":
+        print(f"\nSaturation point: {sat['sessions']} concurrent sessions ({sat['reason']})")
+    else:
+        print(f"\nSaturation point: not reached in the tested range (up to {sat['sessions']} sessions)")
+    print("no-upg = journeys whose art was still the preview after the upgrade wait")
+
+async def main_async(args, pid):
+    tmp = Path(tempfile.mkdtemp(prefix="pairfect-load-"))
+    photo, gallery = write_photos(tmp)
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=True)
+        try:
+            # Warm-up flow: loads the emotion model so level 1 measures steady state.
+            print("Warming up (first run loads the emotion model)…")
+            await run_level(browser, argparse.Namespace(**{**vars(args), "flows": 1}), photo, gallery, 1, pid)
+            levels = []
+            for n in args.levels:
+                print(f"Running {n} concurrent session(s)…")
+                levels.append(await run_level(browser, args, photo, gallery, n, pid))
+                if args.stop_at_saturation and saturation(levels, args.min_gain, args.max_error_rate)["status"] != "not_reached":
+                    break
+            return levels
+        finally:
+            await browser.close()
+
+def main():
+    ap = argparse.ArgumentParser(description="Drive N simulated Pairfect sessions against a real Streamlit server.")
+    ap.add_argument("--levels", default="1,2,4,8,16", help="comma-separated concurrent session counts to ramp through")
+    ap.add_argument("--flows", type=int, default=1, help="full journeys per session at each level")
+    ap.add_argument("--turns", type=int, default=3, help="Love Coach turns per journey")
+    ap.add_argument("--timeout", type=float, default=180, help="per-step timeout in seconds")
+    ap.add_argument("--url", help="target an already running app instead of starting one (RSS needs --pid); "
+                                  "the --*-latency/--rate-429 flags then go to fake_openai.py instead")
+    ap.add_argument("--pid", type=int, help="process to sample RSS from when using --url")
+    ap.add_argument("--chat-latency", type=float, default=0.8)
+    ap.add_argument("--image-latency", type=float, default=4.0)
+    ap.add_argument("--preview-latency", type=float, default=1.0)
+    ap.add_argument("--rate-429", type=float, default=0.0, help="fraction of fake OpenAI calls answered with 429")
+    ap.add_argument("--min-gain", type=float, default=0.10, help="throughput gain a level needs to count as scaling")
+    ap.add_argument("--max-error-rate", type=float, default=0.05)
+    ap.add_argument("--stop-at-saturation", action="store_true", help="stop ramping once throughput stops scaling")
+    ap.add_argument("--json", help="also write the report to this file")
+    args = ap.parse_args()
+    args.levels = [int(n) for n in args.levels.split(",")]
+
+    # With --url the target app (and its fake backend, see fake_openai.py) is managed by the caller.
+    fake = proc = None
+    pid = args.pid
+    try:
+        if not args.url:
+            fake = FakeOpenAI(chat_latency=args.chat_latency, image_latency=args.image_latency,
+                              preview_latency=args.preview_latency, rate_429=args.rate_429).start()
+            port = free_port()
+            proc = start_streamlit(port, fake.base_url)
+            pid = proc.pid
+            args.url = f"http://127.0.0.1:{port}"
+            wait_healthy(args.url, 120)
+        levels = asyncio.run(main_async(args, pid))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait(timeout=30)
+        if fake:
+            fake.stop()
+
+    report = {
+        "backend": ({"chat_latency": args.chat_latency, "image_latency": args.image_latency,
+                     "preview_latency": args.preview_latency, "rate_429": args.rate_429, "requests": fake.stats}
+                    if fake else "external"),
+        "levels": levels,
+        "saturation": saturation(levels, args.min_gain, args.max_error_rate),
+    }
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()